@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Build the optimized YOLO models used by main.py.
+--format engine: captures calibration frames from the cart camera, then
+exports yolov8n.pt to an INT8 TensorRT engine calibrated on those frames.
+Run once on the deployment GPU (engines are not portable across GPUs).
+--format onnx: exports yolov8n.onnx plus the class-name json for the
+ONNX Runtime / OpenVINO path used on CPU-only hosts.
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+
+import cv2
+import torch
+from ultralytics import YOLO
+
+CAMERA_URL = "http://192.168.1.8:8080/video"  # mobile IP webcam
+RESIZE_WIDTH = 480
+RESIZE_HEIGHT = 360
+MODEL_IMGSZ = (384, 480)  # keep in sync with main.py
+CALIB_DIR = "calib"
+NAMES_PATH = "yolov8n_names.json"
+
+
+def batch_size() -> int:
+    """Frames per forward pass, shared with main.py: batches fill a desktop GPU,
+    Jetson (aarch64) and CPU hosts stay at 1."""
+    return 4 if torch.cuda.is_available() and platform.machine() != "aarch64" else 1
+
+
+def capture_calibration_frames(camera_url: str, count: int, interval: float) -> str:
+    """Save `count` resized frames from the camera and return the dataset yaml path."""
+    image_dir = os.path.join(CALIB_DIR, "images")
+    os.makedirs(image_dir, exist_ok=True)
+
+    cap = cv2.VideoCapture(camera_url)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open camera stream: {camera_url}")
+
+    saved = 0
+    try:
+        while saved < count:
+            ret, frame = cap.read()
+            if not ret:
+                time.sleep(0.05)
+                continue
+            frame = cv2.resize(frame, (RESIZE_WIDTH, RESIZE_HEIGHT))
+            cv2.imwrite(os.path.join(image_dir, f"frame_{saved:04d}.jpg"), frame)
+            saved += 1
+            time.sleep(interval)
+    finally:
+        cap.release()
+
+    return image_dir
+
+
+def write_dataset_yaml(image_dir: str, names) -> str:
+    """Write a minimal ultralytics dataset yaml pointing at the calibration images."""
+    yaml_path = os.path.join(CALIB_DIR, "calib.yaml")
+    with open(yaml_path, "w") as f:
+        f.write(f"path: {os.path.abspath(CALIB_DIR)}\n")
+        f.write(f"train: {os.path.relpath(image_dir, CALIB_DIR)}\n")
+        f.write(f"val: {os.path.relpath(image_dir, CALIB_DIR)}\n")
+        f.write(f"names: {json.dumps(list(names))}\n")
+    return yaml_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", choices=("engine", "onnx"), default="engine")
+    parser.add_argument("--camera", default=CAMERA_URL)
+    parser.add_argument("--frames", type=int, default=300, help="calibration frames (200-500)")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between captures")
+    parser.add_argument("--batch", type=int, default=batch_size(),
+                        help="engine batch; the default is this host's main.py BATCH_SIZE")
+    args = parser.parse_args()
+
+    model = YOLO("yolov8n.pt")
+
+    if args.format == "onnx":
+        with open(NAMES_PATH, "w") as f:
+            json.dump(model.names, f)
+        model.export(format="onnx", imgsz=MODEL_IMGSZ, simplify=True, opset=13)
+        return
+
+    image_dir = capture_calibration_frames(args.camera, args.frames, args.interval)
+    yaml_path = write_dataset_yaml(image_dir, model.names.values())
+
+    model.export(
+        format="engine",
+        int8=True,
+        nms=True,  # NMS runs inside the engine; only the kept boxes are copied back
+        dynamic=False,
+        batch=args.batch,
+        imgsz=MODEL_IMGSZ,
+        workspace=4,
+        data=yaml_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+JPEG encoding for the SmartCart MJPEG stream.
+Uses libjpeg-turbo when available, otherwise cv2.imencode. Kept out of
+main.py so encoder worker processes can import it without loading the
+model or starting the camera thread.
+"""
+
+import asyncio
+import logging
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+JPEG_QUALITY = 80
+
+logger = logging.getLogger("SmartCart")
+
+# libjpeg-turbo (SIMD Huffman/DCT) is several times faster than cv2.imencode;
+# fall back to OpenCV when the native library is not installed on this host.
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    jpeg = TurboJPEG()
+
+    def encode_jpeg(frame):
+        return jpeg.encode(frame, quality=JPEG_QUALITY, jpeg_subsample=TJSAMP_420)
+
+    logger.info("🖼️ Using libjpeg-turbo for MJPEG encoding.")
+except (ImportError, OSError, RuntimeError) as e:
+    logger.warning(f"⚠️ TurboJPEG unavailable ({e}), falling back to cv2.imencode.")
+
+    def encode_jpeg(frame):
+        _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return buffer.tobytes()
+
+
+def attach_untracked(name):
+    """Map an existing segment without registering it with this process's resource tracker.
+    The parent owns and unlinks it; a tracked attach would report it leaked (or unlink it)
+    when the worker exits."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def encode_shared(name, shape):
+    """Process-pool entry point: encode the uint8 frame held in shared memory `name`."""
+    shm = attach_untracked(name)
+    try:
+        return encode_jpeg(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+    finally:
+        shm.close()
+
+
+class FrameEncoder:
+    """Encodes one stream's frames on an executor.
+    With a process pool, frames go through a shared-memory slot owned by this
+    encoder instead of being pickled (~500 KB per frame)."""
+
+    def __init__(self, executor, shared: bool = False):
+        self.executor = executor
+        self.shared = shared
+        self._shm = None
+
+    async def encode(self, frame: np.ndarray) -> bytes:
+        loop = asyncio.get_running_loop()
+        if not self.shared:
+            return await loop.run_in_executor(self.executor, encode_jpeg, frame)
+
+        if self._shm is None or self._shm.size < frame.nbytes:
+            self.close()
+            self._shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf)[...] = frame
+        return await loop.run_in_executor(self.executor, encode_shared, self._shm.name, frame.shape)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
@@ -7,23 +7,36 @@ and sends detected object names to the frontend in real-time.
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from ultralytics import YOLO
-import cv2, threading, time, logging, json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio, cv2, multiprocessing, threading, time, logging, os, orjson, sys, torch
+import numpy as np
+from pathlib import Path
+from typing import Final
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared hardware-integration/common package
 
 # ---------------- CONFIG ---------------- #
 CAMERA_URL = "http://192.168.1.8:8080/video"  # mobile IP webcam
-CONFIDENCE_THRESHOLD = 0.6
-RESIZE_WIDTH = 480
-RESIZE_HEIGHT = 360
-FRAME_SKIP = 2
+CONFIDENCE_THRESHOLD: Final = 0.6
+RESIZE_WIDTH: Final = 480
+RESIZE_HEIGHT: Final = 360
+MOTION_THRESHOLD: Final = 4.0  # mean abs gray-level change (0-255) that triggers inference
+MAX_STALE_FRAMES: Final = 30  # re-run YOLO at least this often even on a static scene
+MODEL_WEIGHTS = "yolov8n.pt"
+MODEL_ENGINE = "yolov8n.engine"  # INT8 TensorRT engine built by export_engine.py
+MODEL_ONNX = "yolov8n.onnx"  # CPU fallback built by export_engine.py --format onnx
+MODEL_NAMES = "yolov8n_names.json"
+MODEL_IMGSZ = (384, 480)  # (h, w) of the resized frame, padded to the 32px stride
 
 # ---------------- LOGGING ---------------- #
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SmartCart")
 
 # ---------------- FASTAPI APP ---------------- #
-app = FastAPI(title="SmartCart YOLO Backend", version="3.2.0")
+app = FastAPI(title="SmartCart YOLO Backend", version="3.2.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,30 +46,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------------- JPEG ENCODER ---------------- #
+from jpeg_codec import FrameEncoder
+from common.overlay import conf_sprites, draw_detection, label_sprites
+from export_engine import batch_size
+
+# On multi-core CPU-only hosts, encode on worker processes so JPEG work doesn't
+# share the GIL with inference. The workers are forked here, before the model is
+# loaded and before the camera thread exists (forking a threaded process is unsafe).
+USE_CUDA = torch.cuda.is_available()
+ENCODE_IN_PROCESSES = (not USE_CUDA and (os.cpu_count() or 1) > 2
+                       and "fork" in multiprocessing.get_all_start_methods())
+if ENCODE_IN_PROCESSES:
+    enc_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork"))
+    enc_pool.submit(int).result()  # start the workers now
+else:
+    enc_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jpeg")
+
 # ---------------- YOLO MODEL ---------------- #
-logger.info("🔄 Loading YOLOv8 model...")
-model = YOLO("yolov8n.pt")
+if not USE_CUDA and os.path.exists(MODEL_ONNX):
+    from onnx_detector import OnnxDetector
+
+    logger.info(f"🔄 Loading YOLOv8 ONNX model ({MODEL_ONNX}) for CPU inference...")
+    model = OnnxDetector(MODEL_ONNX, MODEL_NAMES, MODEL_IMGSZ)
+
+    def detect_batch(frames):
+        """The ONNX graph has a fixed batch of 1, so frames run back to back."""
+        return [model.detect(frame) for frame in frames]
+else:
+    model_path = MODEL_ENGINE if USE_CUDA and os.path.exists(MODEL_ENGINE) else MODEL_WEIGHTS
+    logger.info(f"🔄 Loading YOLOv8 model ({model_path})...")
+    model = YOLO(model_path, task="detect")
+
+    def detect_batch(frames):
+        """Return an (N, 6) [x1, y1, x2, y2, conf, class_id] array per frame, in one forward pass.
+        Boxes.data is copied to the host whole, so there is one device sync per frame."""
+        results = model(frames, verbose=False, imgsz=MODEL_IMGSZ, half=False)
+        return [r.boxes.data.cpu().numpy() for r in results]
+
 logger.info("✅ Model loaded successfully.")
 
+# Class names indexed by class id; tuple indexing beats a dict lookup per box
+NAMES = tuple(model.names[i] for i in range(len(model.names)))
+
+# Frames per forward pass: batches fill a desktop GPU, Jetson/CPU hosts stay at 1.
+# export_engine.py builds the TensorRT engine with the same value by default.
+BATCH_SIZE: Final = batch_size()
+
+# ---------------- OVERLAYS ---------------- #
+# Caption masks for every class, indexed by class id like NAMES
+LABEL_SPRITES = label_sprites(NAMES)
+# Confidence masks in 0.01 steps, indexed by round(conf * 100)
+CONF_SPRITES = conf_sprites("{:.2f}", 100)
+
 # ---------------- CAMERA THREAD ---------------- #
-latest_frame = None
-lock = threading.Lock()
+# (seq, frame) pairs, oldest first. The grabber is the only writer and published
+# frames are never modified, so readers take a snapshot without a lock or copy.
+frame_buffer = deque(maxlen=BATCH_SIZE)
+
+def open_camera():
+    """Open the MJPEG stream with FFmpeg, decoding on NVDEC when CUDA is available."""
+    if USE_CUDA and "OPENCV_FFMPEG_CAPTURE_OPTIONS" not in os.environ:
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "hwaccel;cuda|video_codec;mjpeg_cuvid"
+        cap = cv2.VideoCapture(CAMERA_URL, cv2.CAP_FFMPEG)
+        if cap.isOpened():
+            logger.info("🎥 Decoding camera stream on the GPU (mjpeg_cuvid).")
+            return cap
+        logger.warning("⚠️ GPU decode unavailable, falling back to software MJPEG decode.")
+        del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+    return cv2.VideoCapture(CAMERA_URL, cv2.CAP_FFMPEG)
 
 def frame_grabber():
-    global latest_frame
-    cap = cv2.VideoCapture(CAMERA_URL)
+    frame_seq = 0
+    cap = open_camera()
     if not cap.isOpened():
         logger.error("❌ Could not open camera stream.")
         return
 
+    if USE_CUDA and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+        gpu_frame, gpu_resized = cv2.cuda_GpuMat(), cv2.cuda_GpuMat()
+
+        def resize(frame):
+            gpu_frame.upload(frame)
+            cv2.cuda.resize(gpu_frame, (RESIZE_WIDTH, RESIZE_HEIGHT), dst=gpu_resized,
+                            interpolation=cv2.INTER_AREA)
+            return gpu_resized.download()
+    else:
+        # INTER_AREA is the right filter for downscaling and has SIMD paths in OpenCV;
+        # log which instruction sets this build actually uses
+        simd = [line.strip() for line in cv2.getBuildInformation().splitlines()
+                if line.strip().startswith(("Baseline:", "Dispatched code generation:"))]
+        logger.info(f"🧮 OpenCV SIMD: {' | '.join(' '.join(line.split()) for line in simd) or 'unknown'}")
+
+        def resize(frame):
+            return cv2.resize(frame, (RESIZE_WIDTH, RESIZE_HEIGHT), interpolation=cv2.INTER_AREA)
+
     while True:
         ret, frame = cap.read()
         if not ret:
             time.sleep(0.05)
             continue
-        frame = cv2.resize(frame, (RESIZE_WIDTH, RESIZE_HEIGHT))
-        with lock:
-            latest_frame = frame
+        frame = resize(frame)
+        frame_seq += 1
+        frame_buffer.append((frame_seq, frame))
         time.sleep(0.01)
 
 threading.Thread(target=frame_grabber, daemon=True).start()
@@ -80,58 +172,110 @@ async def broadcast_detections(detections):
     """Send detected object names to all connected WebSocket clients."""
     if not active_connections:
         return
-    message = json.dumps({"type": "detections", "data": detections})
-    disconnected = []
-    for ws in active_connections:
-        try:
-            await ws.send_text(message)
-        except Exception:
-            disconnected.append(ws)
-    for ws in disconnected:
-        active_connections.remove(ws)
+    # Text frame: the frontend JSON.parses event.data, which a binary frame would break
+    message = orjson.dumps({"type": "detections", "data": detections}).decode()
+    clients = list(active_connections)
+    # Send to every client concurrently so one slow socket doesn't delay the rest
+    results = await asyncio.gather(*(ws.send_text(message) for ws in clients), return_exceptions=True)
+    for ws, result in zip(clients, results):
+        if isinstance(result, Exception) and ws in active_connections:
+            active_connections.remove(ws)
+
+# MJPEG streams hand detections to this queue; a single task on the server's
+# event loop does the broadcasting.
+detection_queue = None
+broadcast_task = None
+
+async def broadcast_worker():
+    while True:
+        detections = await detection_queue.get()
+        await broadcast_detections(detections)
+
+@app.on_event("startup")
+async def start_broadcast_worker():
+    global detection_queue, broadcast_task
+    detection_queue = asyncio.Queue()
+    broadcast_task = asyncio.create_task(broadcast_worker())
 
 # ---------------- VIDEO STREAM WITH DETECTIONS ---------------- #
+# Blocking work runs off the event loop: one inference thread (the model is not
+# safe to call concurrently) and enc_pool for JPEG encoding.
+MJPEG_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+MJPEG_TAIL = b"\r\n"
+
+infer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo")
+
 @app.get("/video_feed")
-def video_feed():
+async def video_feed():
     """MJPEG stream + YOLO detection + broadcast."""
-    def generate_frames():
-        frame_count = 0
-        while True:
-            global latest_frame
-            if latest_frame is None:
-                time.sleep(0.05)
-                continue
-
-            with lock:
-                frame_copy = latest_frame.copy()
-
-            frame_count += 1
-            detections = []
-
-            if frame_count % FRAME_SKIP == 0:
-                results = model(frame_copy, verbose=False)
-                boxes = results[0].boxes
-
-                for box in boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    label = model.names[cls_id]
-                    if conf >= CONFIDENCE_THRESHOLD:
-                        detections.append({"label": label, "confidence": conf})
-
-                        # Draw bounding boxes
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        cv2.rectangle(frame_copy, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                        cv2.putText(frame_copy, f"{label} {conf:.2f}", (x1, y1 - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-                # Broadcast to WebSocket clients
-                if detections:
-                    import asyncio
-                    asyncio.run(broadcast_detections(detections))
-
-            _, buffer = cv2.imencode(".jpg", frame_copy)
-            yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n")
+    async def generate_frames():
+        loop = asyncio.get_running_loop()
+        # Bind hot-loop globals to locals once per stream (LOAD_FAST instead of LOAD_GLOBAL)
+        conf_threshold, motion_threshold = CONFIDENCE_THRESHOLD, MOTION_THRESHOLD
+        batch_size, max_stale, names, sprites, confs = BATCH_SIZE, MAX_STALE_FRAMES, NAMES, LABEL_SPRITES, CONF_SPRITES
+        draw, header, tail = draw_detection, MJPEG_HEADER, MJPEG_TAIL
+        batch_count = 0
+        last_seq = 0
+        last_detect = -max_stale  # batch_count of the last inference
+        detect_small = None  # downsampled gray copy of the last inferred frame
+        last_boxes = np.empty((0, 6), dtype=np.float32)
+        encoder = FrameEncoder(enc_pool, shared=ENCODE_IN_PROCESSES)
+        try:
+            while True:
+                # Wait until the grabber has a full batch of frames this stream hasn't seen
+                snapshot = list(frame_buffer)
+                if not snapshot or snapshot[-1][0] - last_seq < batch_size:
+                    await asyncio.sleep(0.01)
+                    continue
+                last_seq = snapshot[-1][0]
+                frames = [frame for _, frame in snapshot]
+
+                batch_count += 1
+
+                # Only run YOLO when the scene has moved since the last inference (or
+                # the cached boxes are getting old); otherwise redraw the cached boxes.
+                small = cv2.cvtColor(cv2.resize(frames[-1], (120, 90), interpolation=cv2.INTER_AREA),
+                                     cv2.COLOR_BGR2GRAY)
+                stale = (batch_count - last_detect) * batch_size >= max_stale
+                moved = detect_small is None or cv2.absdiff(detect_small, small).mean() >= motion_threshold
+                if moved or stale:
+                    batch_boxes = await loop.run_in_executor(infer_pool, detect_batch, frames)
+                    last_boxes = batch_boxes[-1]
+                    last_detect, detect_small = batch_count, small
+                else:
+                    batch_boxes = [last_boxes] * len(frames)
+
+                if any(len(boxes) for boxes in batch_boxes):
+                    annotated_frames = []
+                    for frame, boxes in zip(frames, batch_boxes):
+                        boxes = boxes[boxes[:, 4] >= conf_threshold]
+                        detections = []
+                        if not len(boxes):
+                            annotated_frames.append(frame)
+                            continue
+
+                        annotated = frame.copy()  # frames are shared, so draw on a copy
+                        xyxy = boxes[:, :4].astype(np.int32).tolist()
+                        cls_ids = boxes[:, 5].astype(np.int32).tolist()
+                        for (x1, y1, x2, y2), conf, cls_id in zip(xyxy, boxes[:, 4].tolist(), cls_ids):
+                            detections.append({"label": names[cls_id], "confidence": conf})
+                            draw(annotated, sprites[cls_id], confs[round(conf * 100)], x1, y1, x2, y2)
+                        annotated_frames.append(annotated)
+                    frames = annotated_frames
+
+                    # Broadcast the newest frame's detections to WebSocket clients
+                    if detections and last_detect == batch_count:
+                        detection_queue.put_nowait(detections)
+
+                # Yield in capture order so the MJPEG stream stays chronological
+                for frame in frames:
+                    jpeg_bytes = await encoder.encode(frame)
+                    # Yield the part as separate chunks rather than concatenating a copy of the JPEG
+                    yield header
+                    yield jpeg_bytes
+                    yield tail
+        finally:
+            encoder.close()
 
     return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
 
@@ -142,5 +286,16 @@ async def root():
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop has no Windows build (start_backend.bat); detection state lives in
+    # this process, so stay on a single worker.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+        workers=1,
+    )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime YOLOv8 detector for CPU-only hosts.
+Runs yolov8n.onnx through the OpenVINO execution provider (FP16 on CPU)
+when it is available, otherwise through the default CPU provider.
+"""
+
+import json
+import logging
+from typing import Tuple
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+logger = logging.getLogger("SmartCart")
+
+
+class OnnxDetector:
+    def __init__(self, model_path: str, names_path: str, imgsz: Tuple[int, int],
+                 conf_threshold: float = 0.25, iou_threshold: float = 0.45):
+        """Load the ONNX session and the class names written at export time"""
+        providers = ["CPUExecutionProvider"]
+        if "OpenVINOExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, ("OpenVINOExecutionProvider", {"device_type": "CPU_FP16"}))
+
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_dtype = np.float16 if "float16" in self.session.get_inputs()[0].type else np.float32
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self._frame_shape = None  # input size the preprocessing buffers were built for
+
+        with open(names_path) as f:
+            self.names = {int(k): v for k, v in json.load(f).items()}
+
+        logger.info(f"✅ ONNX Runtime providers: {self.session.get_providers()}")
+
+    def _prepare_buffers(self, h: int, w: int):
+        """Compute the letterbox geometry for an input size and allocate reusable buffers"""
+        th, tw = self.imgsz
+        scale = min(th / h, tw / w)
+        nh, nw = round(h * scale), round(w * scale)
+        top, left = (th - nh) // 2, (tw - nw) // 2
+
+        self._frame_shape = (h, w)
+        self._scale, self._pad = scale, (left, top)
+        self._canvas = np.full((th, tw, 3), 114, dtype=np.uint8)
+        self._canvas_view = self._canvas[top:top + nh, left:left + nw]
+        self._resized = np.empty((nh, nw, 3), dtype=np.uint8) if (nh, nw) != (h, w) else None
+        self._input = np.empty((1, 3, th, tw), dtype=self.input_dtype)
+
+    def preprocess(self, frame: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        """Letterbox to imgsz, BGR→RGB, scale to [0, 1] and convert HWC→NCHW.
+        Writes into buffers reused across frames, so steady state allocates nothing."""
+        if frame.shape[:2] != self._frame_shape:
+            self._prepare_buffers(*frame.shape[:2])
+
+        if self._resized is not None:
+            cv2.resize(frame, self._resized.shape[1::-1], dst=self._resized)
+            self._canvas_view[...] = self._resized
+        else:
+            self._canvas_view[...] = frame
+
+        # Channel flip and HWC→CHW are strided views, so this is the only pass over the pixels
+        np.multiply(self._canvas[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=self._input[0], casting="unsafe")
+        return self._input, self._scale, self._pad
+
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        """Run inference and return an (N, 6) array of [x1, y1, x2, y2, conf, class_id]
+        rows, the same layout as ultralytics' Boxes.data"""
+        x, scale, (pad_x, pad_y) = self.preprocess(frame)
+        output = self.session.run(None, {self.input_name: x})[0][0].T  # (N, 4 + classes)
+
+        scores = output[:, 4:]
+        cls_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), cls_ids]
+        keep = confs >= self.conf_threshold
+        if not keep.any():
+            return np.empty((0, 6), dtype=np.float32)
+
+        boxes, cls_ids, confs = output[keep, :4], cls_ids[keep], confs[keep].astype(np.float32)
+
+        # cx, cy, w, h in letterbox space → x, y, w, h in frame space
+        xywh = np.empty_like(boxes, dtype=np.float32)
+        xywh[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - pad_x) / scale
+        xywh[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - pad_y) / scale
+        xywh[:, 2] = boxes[:, 2] / scale
+        xywh[:, 3] = boxes[:, 3] / scale
+
+        # Class-aware NMS: offset boxes per class so different classes never overlap
+        offset = cls_ids[:, None].astype(np.float32) * 4096.0
+        nms_boxes = xywh.copy()
+        nms_boxes[:, :2] += offset
+        kept = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confs.tolist(), self.conf_threshold, self.iou_threshold)
+
+        kept = np.array(kept, dtype=np.int64).flatten()
+        h, w = frame.shape[:2]
+        detections = np.empty((len(kept), 6), dtype=np.float32)
+        detections[:, 0:2] = xywh[kept, :2]
+        detections[:, 2:4] = xywh[kept, :2] + xywh[kept, 2:4]
+        np.clip(detections[:, 0:4:2], 0, w - 1, out=detections[:, 0:4:2])  # x1, x2
+        np.clip(detections[:, 1:4:2], 0, h - 1, out=detections[:, 1:4:2])  # y1, y2
+        detections[:, 4] = confs[kept]
+        detections[:, 5] = cls_ids[kept]
+        return detections
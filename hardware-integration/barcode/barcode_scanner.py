@@ -10,15 +10,35 @@ import requests
 import time
 import logging
 import json
+import queue
+import sys
 import threading
+from collections import deque
 from typing import Optional, Dict, Any, List
-from pyzbar import pyzbar
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.api_client import post_event
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ProductRecord:
+    """Product entry resolved from a barcode"""
+    __slots__ = ("id", "name", "price", "weight", "category", "brand", "barcode")
+    
+    def __init__(self, id: str, name: str, price: float, weight: int, category: str, brand: str,
+                 barcode: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.weight = weight
+        self.category = category
+        self.brand = brand
+        self.barcode = barcode
+
 class BarcodeScanner:
     def __init__(self, api_endpoint: str = "http://localhost:8000/api/cart/add-item"):
         """
@@ -32,7 +52,21 @@ class BarcodeScanner:
         self.running = False
         self.last_scan_time = 0
         self.scan_cooldown = 2.0  # seconds between scans of same barcode
-        self.recent_scans = {}  # Track recent scans to prevent duplicates
+        self.recent_scans = set()  # Barcodes scanned within the cooldown, to prevent duplicates
+        self._scan_expiry = deque()  # (expiry_time, barcode) in scan order
+        self.detector = cv2.barcode.BarcodeDetector()  # OpenCV 1D detector (EAN/UPC)
+        self.scan_scale = 0.5  # frames are scanned at this scale...
+        self.full_res_interval = 10  # ...with a full-resolution pass after this many empty frames
+        self._empty_frames = 0
+        
+        # Capture thread keeps only the newest frame so scanning never works on a stale one
+        self._frame_queue = queue.Queue(maxsize=1)
+        self._capture_thread = None
+        
+        # Cart API calls run on a sender thread so a slow request never stalls scanning
+        self._tx_queue = queue.Queue(maxsize=128)
+        self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self._tx_thread.start()
         
         # Enhanced product database with barcodes (simulating real product database)
         self.product_database = {
@@ -49,6 +83,12 @@ class BarcodeScanner:
             "1234567890123": {"id": "10", "name": "Demo Item", "price": 5.00, "weight": 200, "category": "demo", "brand": "Demo Co"},
         }
         
+        # Records are built once so lookups return shared objects instead of dicts
+        self._products = {
+            barcode: ProductRecord(barcode=barcode, **info)
+            for barcode, info in self.product_database.items()
+        }
+        
     def initialize_camera(self, camera_index: int = 0) -> bool:
         """
         Initialize camera for barcode scanning
@@ -70,6 +110,7 @@ class BarcodeScanner:
             self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
             self.camera.set(cv2.CAP_PROP_FPS, 30)
             self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 1)
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # keep the driver from queueing stale frames
             
             logger.info("Camera initialized successfully for barcode scanning")
             return True
@@ -89,34 +130,47 @@ class BarcodeScanner:
             List of detected barcodes with data and positions
         """
         try:
-            # Decode barcodes in the frame
-            barcodes = pyzbar.decode(frame)
+            # Convert once; the detector only needs luminance
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            
+            # Scan at reduced resolution, falling back to full resolution when
+            # nothing has been found for a while (small or distant barcodes)
+            full_res = self._empty_frames >= self.full_res_interval
+            frame_scale = 1.0 if full_res else self.scan_scale
+            if not full_res:
+                gray = cv2.resize(gray, None, fx=frame_scale, fy=frame_scale, interpolation=cv2.INTER_AREA)
+            
+            # Locate and decode all barcodes in one native call
+            ok, decoded, types, points = self.detector.detectAndDecodeWithType(gray)
             
             detected_barcodes = []
-            for barcode in barcodes:
-                # Extract barcode data
-                barcode_data = barcode.data.decode('utf-8')
-                barcode_type = barcode.type
+            seen = set()
+            for barcode_data, barcode_type, corners in zip(decoded, types, points if ok else ()):
+                # Skip regions that were located but could not be decoded, and repeats
+                if not barcode_data or barcode_data in seen:
+                    continue
+                seen.add(barcode_data)
                 
-                # Get bounding box
-                (x, y, w, h) = barcode.rect
+                # Bounding box of the corner points in full-resolution frame coordinates
+                position = cv2.boundingRect((corners / frame_scale).astype(np.int32))
                 
                 detected_barcodes.append({
                     'data': barcode_data,
                     'type': barcode_type,
-                    'position': (x, y, w, h),
+                    'position': position,
                     'timestamp': time.time()
                 })
                 
                 logger.info(f"Barcode detected: {barcode_data} (Type: {barcode_type})")
             
+            self._empty_frames = 0 if detected_barcodes or full_res else self._empty_frames + 1
             return detected_barcodes
             
         except Exception as e:
             logger.error(f"Error scanning barcodes: {e}")
             return []
     
-    def lookup_product(self, barcode: str) -> Optional[Dict[str, Any]]:
+    def lookup_product(self, barcode: str) -> Optional[ProductRecord]:
         """
         Look up product by barcode
         
@@ -127,22 +181,22 @@ class BarcodeScanner:
             Product data or None if not found
         """
         # First check local database
-        product = self.product_database.get(barcode)
+        product = self._products.get(barcode)
         if product:
             return product
         
         # In production, this would query external APIs or databases
         # For now, return a generic product for unknown barcodes
         logger.warning(f"Unknown barcode: {barcode}")
-        return {
-            "id": f"unknown_{barcode}",
-            "name": f"Unknown Product ({barcode})",
-            "price": 0.99,
-            "weight": 100,
-            "category": "unknown",
-            "brand": "Unknown Brand",
-            "barcode": barcode
-        }
+        return ProductRecord(
+            id=f"unknown_{barcode}",
+            name=f"Unknown Product ({barcode})",
+            price=0.99,
+            weight=100,
+            category="unknown",
+            brand="Unknown Brand",
+            barcode=barcode
+        )
     
     def is_recent_scan(self, barcode: str) -> bool:
         """
@@ -156,22 +210,17 @@ class BarcodeScanner:
         """
         current_time = time.time()
         
-        # Clean old scans
-        self.recent_scans = {
-            code: scan_time 
-            for code, scan_time in self.recent_scans.items() 
-            if current_time - scan_time < self.scan_cooldown
-        }
+        # Expire old scans; entries are in expiry order so only the head needs checking
+        while self._scan_expiry and self._scan_expiry[0][0] <= current_time:
+            _, code = self._scan_expiry.popleft()
+            self.recent_scans.discard(code)
         
         # Check if this barcode was recently scanned
-        if barcode in self.recent_scans:
-            return True
-        
-        return False
+        return barcode in self.recent_scans
     
-    def add_to_cart(self, product_data: Dict[str, Any], barcode: str, user_id: str = "demo_user") -> bool:
+    def add_to_cart(self, product_data: ProductRecord, barcode: str, user_id: str = "demo_user") -> bool:
         """
-        Add product to cart via API
+        Queue product to be added to cart via API
         
         Args:
             product_data: Product information
@@ -179,42 +228,49 @@ class BarcodeScanner:
             user_id: User ID for the cart
             
         Returns:
-            True if successful, False otherwise
+            True if queued, False if the send queue is full
         """
+        payload = {
+            "user_id": user_id,
+            "product_id": product_data.id,
+            "quantity": 1,
+            "scan_type": "barcode",
+            "scan_value": barcode,
+            "timestamp": time.time(),
+            "product_name": product_data.name,
+            "product_price": product_data.price,
+            "product_weight": product_data.weight
+        }
+        
         try:
-            payload = {
-                "user_id": user_id,
-                "product_id": product_data["id"],
-                "quantity": 1,
-                "scan_type": "barcode",
-                "scan_value": barcode,
-                "timestamp": time.time(),
-                "product_name": product_data["name"],
-                "product_price": product_data["price"],
-                "product_weight": product_data["weight"]
-            }
-            
-            response = requests.post(
-                self.api_endpoint,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Successfully added {product_data['name']} to cart")
-                self.indicate_success()
-                return True
-            else:
-                logger.error(f"Failed to add item to cart: {response.status_code} - {response.text}")
-                self.indicate_error()
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+            self._tx_queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            logger.error(f"Cart API queue full, dropping {product_data.name}")
             self.indicate_error()
             return False
     
+    def _tx_loop(self):
+        """Post queued cart payloads until the None sentinel arrives"""
+        while True:
+            payload = self._tx_queue.get()
+            if payload is None:
+                break
+            
+            try:
+                response = post_event(self.api_endpoint, payload)
+                
+                if response.status_code == 200:
+                    logger.info(f"Successfully added {payload['product_name']} to cart")
+                    self.indicate_success()
+                else:
+                    logger.error(f"Failed to add item to cart: {response.status_code} - {response.text}")
+                    self.indicate_error()
+                    
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API request failed: {e}")
+                self.indicate_error()
+    
     def process_frame(self, frame: np.ndarray) -> bool:
         """
         Process a single frame for barcode detection
@@ -249,7 +305,8 @@ class BarcodeScanner:
                 
                 if success:
                     # Mark as recently scanned
-                    self.recent_scans[barcode] = time.time()
+                    self._scan_expiry.append((time.time() + self.scan_cooldown, barcode))
+                    self.recent_scans.add(barcode)
                     item_added = True
                     
                     # Draw bounding box on frame (for debugging)
@@ -301,13 +358,15 @@ class BarcodeScanner:
         
         logger.info("Starting barcode scanner...")
         self.running = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
         
         try:
             while self.running:
-                # Capture frame
-                ret, frame = self.camera.read()
-                if not ret:
-                    logger.warning("Failed to capture frame")
+                # Wait for the newest captured frame
+                try:
+                    frame = self._frame_queue.get(timeout=1.0)
+                except queue.Empty:
                     continue
                 
                 # Process frame for barcodes
@@ -319,9 +378,6 @@ class BarcodeScanner:
                     if cv2.waitKey(1) & 0xFF == ord('q'):
                         break
                 
-                # Small delay to prevent excessive CPU usage
-                time.sleep(0.1)
-                
         except KeyboardInterrupt:
             logger.info("Barcode scanner stopped by user")
         except Exception as e:
@@ -329,12 +385,37 @@ class BarcodeScanner:
         finally:
             self.cleanup()
     
+    def _capture_loop(self):
+        """Read frames while running, replacing any frame the scanner hasn't taken yet"""
+        while self.running:
+            ret, frame = self.camera.read()
+            if not ret:
+                logger.warning("Failed to capture frame")
+                time.sleep(0.1)
+                continue
+            
+            try:
+                self._frame_queue.put_nowait(frame)
+            except queue.Full:
+                try:
+                    self._frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._frame_queue.put_nowait(frame)
+    
     def cleanup(self):
         """Clean up resources"""
         self.running = False
+        if self._capture_thread:
+            self._capture_thread.join(timeout=2)
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
+        
+        # Let the sender thread flush queued items, then stop it
+        if self._tx_thread.is_alive():
+            self._tx_queue.put(None)
+            self._tx_thread.join(timeout=5)
         logger.info("Barcode scanner cleaned up")
 
 def main():
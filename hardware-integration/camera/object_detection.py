@@ -5,28 +5,218 @@ Supports IP Webcam (mobile camera) or local USB/PiCam
 Displays live video stream with bounding boxes and detected product labels
 """
 
+import argparse
 import cv2
+import os
+import re
+import sys
 import time
+import queue
+import threading
 import requests
 import logging
+import platform
 import numpy as np
+import torch
+from pathlib import Path
 from ultralytics import YOLO
+from ultralytics.utils import ops
 from typing import Optional, Dict, Any, List
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.api_client import SESSION, post_event
+from common.overlay import conf_sprites, draw_detection, label_sprites
+
 # -------------------- CONFIG -------------------- #
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SmartCart-YOLO")
 
+# libjpeg-turbo (SIMD IDCT/Huffman) for the IP-webcam MJPEG stream; cv2.imdecode when not installed
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbojpeg = TurboJPEG()
+
+    def decode_jpeg(data: bytes) -> np.ndarray:
+        return _turbojpeg.decode(data, pixel_format=TJPF_BGR)
+except (ImportError, OSError, RuntimeError) as e:
+    logger.warning(f"⚠️ TurboJPEG unavailable ({e}), falling back to cv2.imdecode.")
+
+    def decode_jpeg(data: bytes) -> np.ndarray:
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+# "(xx.x%)" caption masks in 0.1% steps, indexed by round(conf * 1000)
+CONF_SPRITES = conf_sprites("({:.1%})", 1000)
+
+class MJPEGStream:
+    """cv2.VideoCapture stand-in for multipart MJPEG over HTTP (IP Webcam /video).
+    Splits the byte stream on JPEG SOI/EOI markers and decodes each frame directly."""
+
+    def __init__(self, url: str, chunk_size: int = 4096):
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        try:
+            self._response = SESSION.get(url, stream=True, timeout=5)
+            self._response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ MJPEG stream request failed: {e}")
+            self._response = None
+
+    def isOpened(self) -> bool:
+        return self._response is not None
+
+    def set(self, prop_id: int, value: float) -> bool:
+        return False  # frame size and buffering are fixed by the server
+
+    def read(self):
+        """Return (ok, frame) for the next complete JPEG in the stream"""
+        if self._response is None:
+            return False, None
+
+        buf = self._buffer
+        scanned = 0  # bytes already searched for EOI, so each chunk is scanned once
+        while True:
+            start = buf.find(b"\xff\xd8")
+            if start > 0:
+                del buf[:start]  # multipart boundary and part headers
+                scanned, start = max(scanned - start, 0), 0
+            if start == 0:
+                end = buf.find(b"\xff\xd9", max(scanned - 1, 2))
+                if end != -1:
+                    jpeg = bytes(buf[:end + 2])
+                    del buf[:end + 2]
+                    try:
+                        frame = decode_jpeg(jpeg)
+                    except Exception as e:  # truncated/corrupt JPEG from the webcam
+                        logger.warning(f"⚠️ Dropping undecodable MJPEG frame: {e}")
+                        return False, None
+                    return frame is not None, frame
+                scanned = len(buf)
+            elif len(buf) > 1:
+                del buf[:-1]  # no SOI yet; keep a trailing 0xff that may start one
+
+            try:
+                chunk = self._response.raw.read(self.chunk_size)
+            except Exception as e:
+                logger.error(f"❌ MJPEG stream read failed: {e}")
+                chunk = b""
+            if not chunk:
+                return False, None
+            buf += chunk
+
+    def release(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+def open_jetson_mjpeg(url: str) -> Optional[cv2.VideoCapture]:
+    """Open an MJPEG URL through GStreamer with nvjpegdec on Jetson; None elsewhere or on failure"""
+    if not Path("/etc/nv_tegra_release").exists() or not re.search(r"GStreamer:\s+YES", cv2.getBuildInformation()):
+        return None
+    pipeline = (
+        f"souphttpsrc location={url} is-live=true ! multipartdemux ! jpegparse ! nvjpegdec ! "
+        "nvvidconv ! video/x-raw,format=BGRx ! videoconvert ! video/x-raw,format=BGR ! "
+        "appsink drop=1 max-buffers=1 sync=false"
+    )
+    cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+    if cap.isOpened():
+        logger.info("🎥 Decoding camera stream on the Jetson JPEG engine (nvjpegdec).")
+        return cap
+    logger.warning("⚠️ GStreamer nvjpegdec pipeline failed, falling back to software decode.")
+    return None
+
+def edgetpu_available() -> bool:
+    """True when a Coral Edge TPU is attached (needs pycoral and libedgetpu)"""
+    try:
+        from pycoral.utils.edgetpu import list_edge_tpus
+    except ImportError:
+        return False
+    return bool(list_edge_tpus())
+
+def performance_cores() -> set:
+    """CPUs with the highest max clock (big cores on big.LITTLE ARM); empty if uniform or unknown"""
+    max_freqs = {}
+    for path in Path("/sys/devices/system/cpu").glob("cpu[0-9]*/cpufreq/cpuinfo_max_freq"):
+        max_freqs[int(path.parent.parent.name[3:])] = int(path.read_text())
+    if len(set(max_freqs.values())) < 2:
+        return set()
+    top = max(max_freqs.values())
+    return {cpu for cpu, freq in max_freqs.items() if freq == top}
+
+def default_batch_size() -> int:
+    """Frames per YOLO call: batch on desktop GPUs to amortize per-call overhead; the CPU/TPU
+    exports are batch-1, and on Jetson the added latency outweighs the gain"""
+    return 4 if torch.cuda.is_available() and platform.machine() != "aarch64" else 1
+
+def export_targets(model_name: str, batch_size: int) -> List[tuple]:
+    """(export path, ultralytics export args) to use on this host, best first"""
+    stem = Path(model_name).stem
+    if torch.cuda.is_available():
+        # CUDA: TensorRT FP16 engine (Tensor Core kernels, fused layers) with NMS built into the
+        # graph, so only surviving boxes come back to the host; needs TensorRT installed.
+        # Dynamic batch (1..batch_size): the display loop batches frames, detect_objects sends one.
+        return [(f"{stem}.engine", dict(format="engine", half=True, nms=True, imgsz=640, dynamic=True,
+                                        batch=batch_size, device=0, workspace=4))]
+
+    targets = []
+    if edgetpu_available():
+        # Coral Edge TPU: int8 model compiled with edgetpu_compiler; ultralytics loads
+        # the libedgetpu delegate for *_edgetpu.tflite files
+        targets.append((f"{stem}_saved_model/{stem}_full_integer_quant_edgetpu.tflite", dict(format="edgetpu")))
+
+    if platform.machine() in ("aarch64", "arm64", "armv7l"):
+        # ARM (Pi): full-integer int8 TFLite, including input/output, runs on NEON int8 kernels.
+        # Not used on x86, where TFLite's int8 kernels are slower than float.
+        targets.append((f"{stem}_saved_model/{stem}_full_integer_quant.tflite", dict(format="tflite", int8=True)))
+    elif platform.machine() in ("x86_64", "AMD64", "i686", "x86"):
+        # x86: OpenVINO compiles the graph for the host's AVX2/AVX-512 units; FP16 weights
+        # halve the model's size, with compute left to the plugin. FP16 TFLite as the fallback.
+        targets.append((f"{stem}_openvino_model", dict(format="openvino", half=True)))
+        targets.append((f"{stem}_saved_model/{stem}_float16.tflite", dict(format="tflite", half=True)))
+    else:
+        # Other CPUs: TFLite's XNNPACK kernels beat eager PyTorch for a small model like yolov8n
+        targets.append((f"{stem}_saved_model/{stem}_float32.tflite", dict(format="tflite")))
+    return targets
+
+def export_weights(model_name: str) -> Optional[str]:
+    """Offline step: export model_name for this host, trying each target in order.
+    May install export toolchains (TensorRT, TensorFlow, OpenVINO, edgetpu_compiler), so it
+    is never run from load_model."""
+    for export_path, export_args in export_targets(model_name, default_batch_size()):
+        if Path(export_path).exists():
+            logger.info(f"✅ {export_path} already exported")
+            return export_path
+        try:
+            logger.info(f"📦 Exporting {model_name} to {export_args['format']}...")
+            return str(YOLO(model_name).export(**export_args))
+        except Exception as e:
+            logger.warning(f"⚠️ {export_args['format']} export failed: {e}")
+    logger.error(f"❌ No export succeeded for {model_name}")
+    return None
+
 class SmartCartYOLO:
     def __init__(self, api_endpoint: str = "http://localhost:8000/api/cart/add-item"):
         """Initialize YOLO-based detector"""
         self.api_endpoint = api_endpoint
         self.camera = None
         self.model = None
+        self.class_names = ()
+        self.batch_size = 1  # frames per YOLO call, resolved in load_model
+        self.imgsz = 640
+        self._half = False  # FP16 inference, enabled on CUDA in load_model
+        self._net = None  # raw PyTorch network when .pt weights run on CUDA (bypasses ultralytics preprocessing)
+        self._input_host = None  # pinned letterboxed batch, reused every call
+        self._input_dev = None
+        self._letterbox = None  # (frame shape, scale, left, top, new width, new height)
+        self._graphs = {}  # batch size -> (captured CUDA graph, its static output)
+        self._all_cpus = None  # affinity before inference was pinned to the big cores
         self.running = False
         self.snapshot_url = None
-        self.last_detection_time = 0
+        self.last_detection_ns = 0  # time.monotonic_ns() of the last cart API call
         self.detection_interval = 2.0  # seconds between API calls
+        self.hash_threshold = 4  # dHash bits that must change before YOLO runs again
+        self._last_hash = None
+        self._last_detections = []
+        self._label_sprites = ()  # "name " caption masks, indexed by class id; built in load_model
 
         # Known SmartCart product mappings (example set)
         self.product_mapping = {
@@ -40,14 +230,36 @@ class SmartCartYOLO:
             "packet": {"id": "8", "name": "Snack Packet", "price": 1.50}
         }
 
+        # One alternation over all product keywords, matched anywhere in the class name
+        self._keyword_re = re.compile("|".join(map(re.escape, self.product_mapping)))
+        self._class_to_product = {}  # class name -> product, built once from the model's fixed label set
+
+        # Capture thread keeps only the newest frame so detection never works on a stale one
+        self._frame_queue = queue.Queue(maxsize=1)
+        self._capture_thread = None
+        # Inference runs on its own thread; display (imshow/waitKey) must stay on the main thread
+        self._result_queue = queue.Queue(maxsize=1)  # newest (frames, detections) batch
+        self._inference_thread = None
+
+        # Cart API calls run on a sender thread so a slow request never stalls the feed
+        self._tx_queue = queue.Queue(maxsize=128)
+        self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self._tx_thread.start()
+
     # -------------------- CAMERA INIT -------------------- #
-    def initialize_camera(self, camera_source: str = 0) -> bool:
-        """Initialize camera (IP Webcam or USB/PiCam)"""
+    def initialize_camera(self, camera_source: str = 0, frame_size: tuple = (640, 480)) -> bool:
+        """Initialize camera (IP Webcam or USB/PiCam) at frame_size (width, height)"""
         try:
             logger.info(f"🎥 Initializing camera source: {camera_source}")
 
             if isinstance(camera_source, str) and camera_source.startswith("http"):
-                self.camera = cv2.VideoCapture(camera_source)
+                # IP Webcam scales the stream on the phone when the size is in the query string;
+                # set() cannot resize an HTTP MJPEG source
+                if camera_source.endswith("/video"):
+                    camera_source = f"{camera_source}?{frame_size[0]}x{frame_size[1]}"
+                # Hardware JPEG decode on Jetson; elsewhere parse the MJPEG stream ourselves
+                # instead of going through the FFmpeg demuxer
+                self.camera = open_jetson_mjpeg(camera_source) or MJPEGStream(camera_source)
                 base_url = camera_source.split("/video")[0]
                 self.snapshot_url = f"{base_url}/shot.jpg"
             else:
@@ -57,8 +269,10 @@ class SmartCartYOLO:
                 logger.error("❌ Failed to open video stream.")
                 return False
 
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Capture at the size we detect at, so frames never need a CPU resize first
+            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # keep the driver from queueing stale frames
             logger.info("✅ Camera initialized successfully")
             return True
 
@@ -67,69 +281,197 @@ class SmartCartYOLO:
             return False
 
     # -------------------- YOLO MODEL -------------------- #
+    def select_weights(self, model_name: str) -> str:
+        """Pick the model file to run on this host: the first exported artifact that exists, else model_name"""
+        if not model_name.endswith(".pt"):
+            return model_name
+
+        for export_path, _ in export_targets(model_name, self.batch_size):
+            if Path(export_path).exists():
+                return export_path
+        logger.warning(f"⚠️ No exported model for this host, running {model_name} "
+                       f"(build one with: python object_detection.py --export)")
+        return model_name
+
     def load_model(self, model_name: str = "yolov8n.pt") -> bool:
         """Load YOLOv8 model"""
         try:
-            self.model = YOLO(model_name)
+            # On big.LITTLE boards keep inference (and the thread pools created with the model)
+            # on the performance cores; leave OpenCV a couple of threads for capture/drawing.
+            # Other hosts keep the default affinity and thread counts.
+            try:
+                big_cores = performance_cores()
+                if big_cores and hasattr(os, "sched_setaffinity"):
+                    self._all_cpus = os.sched_getaffinity(0)
+                    os.sched_setaffinity(0, big_cores)
+                    torch.set_num_threads(len(big_cores))
+                    cv2.setNumThreads(2)
+                    logger.info(f"📌 Inference pinned to performance cores {sorted(big_cores)}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Could not pin inference to performance cores: {e}")
+
+            self.batch_size = default_batch_size()
+            if torch.cuda.is_available():
+                # FP16 convolutions on Tensor Cores; any FP32 matmuls left over may use TF32
+                self._half = True
+                torch.set_float32_matmul_precision("high")
+            model_name = self.select_weights(model_name)
+            self.model = YOLO(model_name, task="detect")
+            # Class labels as an interned tuple, indexed by class id in the detection loop
+            self.class_names = tuple(sys.intern(self.model.names[i]) for i in range(len(self.model.names)))
+            self._label_sprites = label_sprites(self.class_names)
+            self._class_to_product = {}
+            for name in self.class_names:
+                product = self.map_to_product(name)
+                if product:
+                    self._class_to_product[name] = product
+            if model_name.endswith(".pt") and torch.cuda.is_available():
+                self._prepare_direct()
             logger.info(f"✅ YOLOv8 model loaded successfully: {model_name}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to load YOLO model: {e}")
             return False
 
+    def _prepare_direct(self):
+        """Move the .pt network to the GPU in FP16 and preallocate its input tensors once"""
+        self._net = self.model.model.to("cuda").half().eval()
+        shape = (self.batch_size, 3, self.imgsz, self.imgsz)
+        # Letterbox padding (114 gray) is written once; frames only overwrite the image region
+        self._input_host = torch.full(shape, 114 / 255.0, dtype=torch.float16).pin_memory()
+        self._input_dev = torch.empty(shape, dtype=torch.float16, device="cuda")
+        logger.info("⚡ Running the PyTorch model directly on preallocated CUDA input buffers")
+
+    def _detect_direct(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Letterbox into the pinned buffer, copy to the GPU and call the network without ultralytics' predictor"""
+        n = len(frames)
+        h, w = frames[0].shape[:2]
+        if self._letterbox is None or self._letterbox[0] != (h, w):
+            scale = min(self.imgsz / h, self.imgsz / w)
+            nw, nh = round(w * scale), round(h * scale)
+            self._input_host.fill_(114 / 255.0)
+            self._letterbox = ((h, w), scale, (self.imgsz - nw) // 2, (self.imgsz - nh) // 2, nw, nh)
+        _, scale, left, top, nw, nh = self._letterbox
+
+        # Resize, BGR→RGB, scale to [0, 1] and HWC→NCHW in one OpenCV call
+        blob = cv2.dnn.blobFromImages(frames, 1 / 255.0, (nw, nh), swapRB=True, crop=False)
+        self._input_host[:n, :, top:top + nh, left:left + nw].copy_(torch.from_numpy(blob))
+        x = self._input_dev[:n]
+        x.copy_(self._input_host[:n], non_blocking=True)
+
+        with torch.inference_mode():
+            preds = ops.non_max_suppression(self._forward(x), conf_thres=0.25, iou_thres=0.7)
+
+        batch_detections = []
+        for det in preds:
+            det = det.cpu().numpy()
+            boxes = det[:, :4]
+            boxes[:, 0::2] = ((boxes[:, 0::2] - left) / scale).clip(0, w)
+            boxes[:, 1::2] = ((boxes[:, 1::2] - top) / scale).clip(0, h)
+            batch_detections.append([
+                {"class_id": int(c), "class_name": self.class_names[int(c)], "confidence": float(conf),
+                 "bbox": box.tolist()}
+                for box, conf, c in zip(boxes, det[:, 4], det[:, 5])
+            ])
+        return batch_detections
+
+    def _forward(self, x: torch.Tensor):
+        """Replay the network as a CUDA graph for this batch size, capturing it on first use.
+        x is a view of the preallocated device buffer, so its address is the same on every call."""
+        n = x.shape[0]
+        if self._graphs is None:
+            return self._net(x)
+        if n not in self._graphs:
+            try:
+                # Warm up on a side stream (cuDNN autotuning, allocator) before capture
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream):
+                    for _ in range(3):
+                        self._net(x)
+                torch.cuda.current_stream().wait_stream(stream)
+
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph):
+                    out = self._net(x)
+                self._graphs[n] = (graph, out)
+                logger.info(f"📸 Captured CUDA graph for batch size {n}")
+            except Exception as e:
+                logger.warning(f"⚠️ CUDA graph capture failed ({e}), running the network eagerly.")
+                self._graphs = None
+                return self._net(x)
+        graph, out = self._graphs[n]
+        graph.replay()
+        return out
+
     # -------------------- DETECTION LOGIC -------------------- #
-    def detect_objects(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        """Run YOLO inference on frame"""
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run YOLO inference on a list of frames in one call; one detection list per frame"""
         try:
-            results = self.model(frame, stream=False, verbose=False)
-            detections = []
+            if self._net is not None:
+                return self._detect_direct(frames)
+            results = self.model(frames, stream=False, half=self._half, imgsz=self.imgsz, verbose=False)
+            batch_detections = []
             for r in results:
-                for box in r.boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    class_name = self.model.names[cls_id]
-                    detections.append({
-                        "class_name": class_name,
-                        "confidence": conf,
-                        "bbox": box.xyxy[0].tolist()
-                    })
-            return detections
+                # One device-to-host copy per frame: rows of [x1, y1, x2, y2, conf, cls]
+                data = r.boxes.data.cpu().numpy()
+                names = self.class_names
+                batch_detections.append([
+                    {"class_id": int(c), "class_name": names[int(c)], "confidence": float(conf), "bbox": box.tolist()}
+                    for box, conf, c in zip(data[:, :4], data[:, 4], data[:, 5])
+                ])
+            return batch_detections
         except Exception as e:
             logger.error(f"Detection error: {e}")
-            return []
+            return [[] for _ in frames]
+
+    def detect_objects(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        """Run YOLO inference on frame"""
+        return self.detect_batch([frame])[0]
+
+    def frame_hash(self, frame: np.ndarray) -> int:
+        """64-bit difference hash: on a 9x8 gray thumbnail, one bit per cell brighter than its right neighbour"""
+        small = cv2.cvtColor(cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return int.from_bytes(np.packbits(small[:, :-1] > small[:, 1:]).tobytes(), "big")
 
     def map_to_product(self, class_name: str) -> Optional[Dict[str, Any]]:
         """Map YOLO class to SmartCart product"""
-        class_name = class_name.lower()
-        for key, value in self.product_mapping.items():
-            if key in class_name:
-                return value
-        return None
+        match = self._keyword_re.search(class_name.lower())
+        return self.product_mapping[match.group()] if match else None
 
-    def send_to_cart(self, product: Dict[str, Any], confidence: float, user_id: str = "demo_user"):
-        """Send detection to backend"""
+    def send_to_cart(self, product: Dict[str, Any], confidence: float, user_id: str = "demo_user") -> bool:
+        """Queue detection for the backend; returns False if the send queue is full"""
+        payload = {
+            "user_id": user_id,
+            "product_id": product["id"],
+            "quantity": 1,
+            "scan_type": "camera",
+            "scan_value": f"detected_{product['id']}",
+            "confidence": confidence,
+            "timestamp": time.time()
+        }
         try:
-            payload = {
-                "user_id": user_id,
-                "product_id": product["id"],
-                "quantity": 1,
-                "scan_type": "camera",
-                "scan_value": f"detected_{product['id']}",
-                "confidence": confidence,
-                "timestamp": time.time()
-            }
-            response = requests.post(
-                self.api_endpoint,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-            if response.status_code == 200:
-                logger.info(f"🛒 Added {product['name']} to cart (conf={confidence:.2f})")
-            else:
-                logger.warning(f"⚠️ API returned {response.status_code}: {response.text}")
-        except Exception as e:
-            logger.error(f"Error sending to cart API: {e}")
+            self._tx_queue.put_nowait((product, payload))
+            return True
+        except queue.Full:
+            logger.warning(f"⚠️ Cart API queue full, dropping {product['name']}")
+            return False
+
+    def _tx_loop(self):
+        """Post queued detections until the None sentinel arrives"""
+        while True:
+            item = self._tx_queue.get()
+            if item is None:
+                break
+            product, payload = item
+            try:
+                response = post_event(self.api_endpoint, payload)
+                if response.status_code == 200:
+                    logger.info(f"🛒 Added {product['name']} to cart (conf={payload['confidence']:.2f})")
+                else:
+                    logger.warning(f"⚠️ API returned {response.status_code}: {response.text}")
+            except Exception as e:
+                logger.error(f"Error sending to cart API: {e}")
 
     # -------------------- MAIN DETECTION LOOP -------------------- #
     def start_detection(self):
@@ -140,62 +482,134 @@ class SmartCartYOLO:
 
         logger.info("🚀 Starting YOLO detection... Press 'q' to quit.")
         self.running = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
+        self._inference_thread = threading.Thread(target=self._inference_loop, daemon=True)
+        self._inference_thread.start()
 
+        interval_ns = int(self.detection_interval * 1e9)
         try:
             while self.running:
-                ret, frame = self.camera.read()
-                if not ret:
-                    logger.warning("⚠️ Frame capture failed, skipping...")
-                    time.sleep(0.1)
+                try:
+                    frames, batch_detections = self._result_queue.get(timeout=1.0)
+                except queue.Empty:
                     continue
 
-                detections = self.detect_objects(frame)
-
-                for det in detections:
-                    x1, y1, x2, y2 = map(int, det["bbox"])
-                    cls = det["class_name"]
-                    conf = det["confidence"]
+                for frame, detections in zip(frames, batch_detections):
+                    now = time.monotonic_ns()
+                    for det in detections:
+                        x1, y1, x2, y2 = map(int, det["bbox"])
+                        cls = det["class_name"]
+                        conf = det["confidence"]
 
-                    # Draw bounding box and label
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    label = f"{cls} ({conf*100:.1f}%)"
-                    cv2.putText(frame, label, (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                        # Draw bounding box and "name (xx.x%)" from prerendered masks, no per-box text rendering
+                        draw_detection(frame, self._label_sprites[det["class_id"]], CONF_SPRITES[round(conf * 1000)],
+                                       x1, y1, x2, y2)
 
-                    # Send to backend if mapped product found and interval passed
-                    if time.time() - self.last_detection_time > self.detection_interval:
-                        product = self.map_to_product(cls)
-                        if product:
-                            self.send_to_cart(product, conf)
-                            self.last_detection_time = time.time()
+                        # Send to backend if mapped product found and interval passed
+                        if now - self.last_detection_ns > interval_ns:
+                            product = self._class_to_product.get(cls)
+                            if product:
+                                self.send_to_cart(product, conf)
+                                self.last_detection_ns = now
 
-                cv2.imshow("Smart Cart - YOLOv8 Live Feed", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    logger.info("🛑 Exiting YOLO detection loop.")
-                    break
+                    cv2.imshow("Smart Cart - YOLOv8 Live Feed", frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        logger.info("🛑 Exiting YOLO detection loop.")
+                        self.running = False
+                        break
 
         except KeyboardInterrupt:
             logger.info("Interrupted by user.")
         finally:
             self.cleanup()
 
+    def _capture_loop(self):
+        """Read frames while running, replacing any frame the detector hasn't taken yet"""
+        if self._all_cpus:
+            os.sched_setaffinity(0, self._all_cpus)  # capture may run on any core
+        while self.running:
+            try:
+                ret, frame = self.camera.read()
+            except Exception as e:
+                logger.error(f"Error reading frame: {e}")
+                ret, frame = False, None
+            if not ret or frame is None:
+                logger.warning("⚠️ Frame capture failed, skipping...")
+                time.sleep(0.1)
+                continue
+
+            self._put_latest(self._frame_queue, frame)
+
+    def _inference_loop(self):
+        """Batch the newest frames, run YOLO and hand (frames, detections) to the display loop"""
+        frames = []
+        while self.running:
+            try:
+                frames.append(self._frame_queue.get(timeout=1.0))
+            except queue.Empty:
+                continue
+            if len(frames) < self.batch_size:
+                continue
+
+            # Skip YOLO when the newest frame is a near-duplicate and reuse the last detections
+            frame_hash = self.frame_hash(frames[-1])
+            if self._last_hash is None or bin(frame_hash ^ self._last_hash).count("1") >= self.hash_threshold:
+                batch_detections = self.detect_batch(frames)
+                self._last_detections = batch_detections[-1]
+                self._last_hash = frame_hash
+            else:
+                batch_detections = [self._last_detections] * len(frames)
+
+            self._put_latest(self._result_queue, (frames, batch_detections))
+            frames = []
+
+    @staticmethod
+    def _put_latest(q: queue.Queue, item):
+        """Put item on a size-1 queue, replacing anything the consumer hasn't taken yet"""
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(item)
+
     def cleanup(self):
         """Cleanup resources"""
+        self.running = False
+        for thread in (self._capture_thread, self._inference_thread):
+            if thread:
+                thread.join(timeout=2)
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
-        self.running = False
+
+        # Let the sender thread flush queued detections, then stop it
+        if self._tx_thread.is_alive():
+            self._tx_queue.put(None)
+            self._tx_thread.join(timeout=5)
         logger.info("🧹 Cleaned up resources.")
 
 
 # -------------------- MAIN -------------------- #
 def main():
+    parser = argparse.ArgumentParser(description="SmartCart YOLO camera detector")
+    parser.add_argument("--export", action="store_true",
+                        help="export the model for this host (TensorRT/Edge TPU/TFLite/OpenVINO) and exit")
+    args = parser.parse_args()
+
     API_ENDPOINT = "http://localhost:8000/api/cart/add-item"
     CAMERA_SOURCE = "http://192.168.1.8:8080/video"  # IP Webcam stream
     MODEL_NAME = "yolov8n.pt"  # lightweight, fast model
+    FRAME_SIZE = (640, 480)  # lower (e.g. 320x240) for fixed-mount cameras close to the products
+
+    if args.export:
+        sys.exit(0 if export_weights(MODEL_NAME) else 1)
 
     detector = SmartCartYOLO(API_ENDPOINT)
-    if not detector.initialize_camera(CAMERA_SOURCE):
+    if not detector.initialize_camera(CAMERA_SOURCE, FRAME_SIZE):
         logger.error("Camera initialization failed.")
         return
     if not detector.load_model(MODEL_NAME):
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Backend API client shared by the Smart Cart hardware integrations.
+One keep-alive session per process, so camera, barcode and RFID calls
+reuse pooled connections instead of reconnecting on every event.
+"""
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Retries (with exponential backoff) only cover failed connects, where the request never
+# reached the backend; read timeouts and error statuses are not retried so an add is never doubled
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1),
+))
+
+
+def post_event(url: str, payload: dict, timeout: float = 5.0) -> requests.Response:
+    """POST a JSON event to the backend over the shared session"""
+    return SESSION.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=timeout)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Detection overlays shared by the backend stream and the camera display.
+Labels are rasterized once; drawing a detection is then a few masked NumPy
+copies instead of Hershey stroke rendering on every frame. Imports only
+OpenCV and NumPy, so it loads without the model or the camera.
+"""
+
+import cv2
+import numpy as np
+
+BOX_COLOR = np.array((0, 255, 0), dtype=np.uint8)
+LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS = cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
+LABEL_HEIGHT = cv2.getTextSize("A", LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS)[0][1]
+# Baseline row inside every sprite: brackets, slashes and "|" reach 2px above the cap height
+LABEL_ASCENT = LABEL_HEIGHT + 3
+
+
+def render_label(text):
+    """Rasterize text into a boolean glyph mask with a 1px margin and its baseline at row LABEL_ASCENT."""
+    (w, _), baseline = cv2.getTextSize(text, LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS)
+    canvas = np.zeros((LABEL_ASCENT + baseline + 1, w + 2), dtype=np.uint8)
+    cv2.putText(canvas, text, (1, LABEL_ASCENT), LABEL_FONT, LABEL_SCALE, 255, LABEL_THICKNESS)
+    return canvas > 127  # drop antialiased edge pixels (OpenCV >= 5 antialiases putText)
+
+
+def label_sprites(names):
+    """Glyph masks for "name " of every class, indexed like names."""
+    return tuple(render_label(f"{name} ") for name in names)
+
+
+def conf_sprites(fmt, steps):
+    """Glyph masks for fmt.format(conf) at every conf step, indexed by round(conf * steps)."""
+    return tuple(render_label(fmt.format(c / steps)) for c in range(steps + 1))
+
+
+def blit(frame, mask, x, y):
+    """Paint BOX_COLOR into frame wherever mask is set, clipped to the frame."""
+    h, w = mask.shape
+    fh, fw = frame.shape[:2]
+    x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, fw), min(y + h, fh)
+    if x0 < x1 and y0 < y1:
+        np.copyto(frame[y0:y1, x0:x1], BOX_COLOR, where=mask[y0 - y:y1 - y, x0 - x:x1 - x, None])
+
+
+def draw_detection(frame, name_mask, conf_mask, x1, y1, x2, y2):
+    """Draw a 2px box and a "label conf" caption above it, like cv2.rectangle + cv2.putText at (x1, y1 - 10)."""
+    fh, fw = frame.shape[:2]
+    x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, fw - 1), min(y2, fh - 1)
+    frame[y1:y1 + 2, x1:x2 + 1] = BOX_COLOR
+    frame[y2 - 1:y2 + 1, x1:x2 + 1] = BOX_COLOR
+    frame[y1:y2 + 1, x1:x1 + 2] = BOX_COLOR
+    frame[y1:y2 + 1, x2 - 1:x2 + 1] = BOX_COLOR
+
+    # Sprites carry a 1px left margin; the name's advance is its text width - 2 (mask width - 4)
+    top = y1 - 10 - LABEL_ASCENT
+    blit(frame, name_mask, x1 - 1, top)
+    blit(frame, conf_mask, x1 + name_mask.shape[1] - 5, top)
@@ -0,0 +1,48 @@
+"""Composite label sprites against the cv2.putText captions they replace."""
+
+import cv2
+import numpy as np
+import pytest
+
+from common.overlay import (BOX_COLOR, LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS, conf_sprites, draw_detection,
+                            label_sprites)
+
+NAMES = ("person", "bottle", "cup", "cell phone", "banana", "apple", "orange", "tv", "car", "dog")
+SPRITES = label_sprites(NAMES)
+
+# (conf sprite format, steps, the putText caption it replaces)
+CAPTIONS = {
+    "backend": ("{:.2f}", 100, lambda name, conf: f"{name} {conf:.2f}"),
+    "camera": ("({:.1%})", 1000, lambda name, conf: f"{name} ({conf*100:.1f}%)"),
+}
+CONF_SPRITES = {style: conf_sprites(fmt, steps) for style, (fmt, steps, _) in CAPTIONS.items()}
+
+
+def caption_mask(frame):
+    return frame[:, :, 1] > 127
+
+
+@pytest.mark.parametrize("style", CAPTIONS)
+@pytest.mark.parametrize("conf", [0.31, 0.5, 0.873, 1.0])
+@pytest.mark.parametrize("cls_id", range(len(NAMES)))
+def test_caption_matches_puttext(cls_id, conf, style):
+    _, steps, caption = CAPTIONS[style]
+    x1, y1, x2, y2 = 30, 70, 300, 110
+    composite = np.zeros((120, 400, 3), dtype=np.uint8)
+    draw_detection(composite, SPRITES[cls_id], CONF_SPRITES[style][round(conf * steps)], x1, y1, x2, y2)
+
+    reference = np.zeros_like(composite)
+    cv2.putText(reference, caption(NAMES[cls_id], conf), (x1, y1 - 10), LABEL_FONT, LABEL_SCALE,
+                BOX_COLOR.tolist(), LABEL_THICKNESS)
+
+    # Compare only the caption rows above the box
+    got, want = caption_mask(composite)[:y1], caption_mask(reference)[:y1]
+    got_rows, got_cols = np.nonzero(got)
+    want_rows, want_cols = np.nonzero(want)
+    assert (got_rows.min(), got_rows.max()) == (want_rows.min(), want_rows.max())
+    assert got_cols.min() == want_cols.min()
+    # Splitting the text rounds glyph positions separately, so allow glyphs to move by a pixel
+    assert abs(int(got_cols.max()) - int(want_cols.max())) <= 1
+    near = np.ones((1, 3), np.uint8)
+    assert not np.any(got & ~cv2.dilate(want.view(np.uint8), near).view(bool))
+    assert not np.any(want & ~cv2.dilate(got.view(np.uint8), near).view(bool))
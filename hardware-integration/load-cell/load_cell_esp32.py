@@ -29,6 +29,7 @@ class LoadCellESP32:
         
         # Load cell configuration
         self.calibration_factor = 1000.0
+        self._cal_factor_q10 = round(self.calibration_factor * 1024)  # milligrams per ADC count, Q10 fixed point
         self.weight_threshold = 50.0  # grams
         self.stable_reading_count = 5
         self.reading_interval = 1000  # milliseconds
@@ -36,6 +37,8 @@ class LoadCellESP32:
         # Weight tracking variables
         self.current_weight = 0.0
         self.previous_weight = 0.0
+        self._current_mg = 0  # smoothed weight in integer milligrams
+        self._previous_mg = 0
         self.stable_weight = 0.0
         self.stable_count = 0
         self.last_reading = 0
@@ -70,22 +73,22 @@ class LoadCellESP32:
             print(f"\nWiFi connection failed!")
             self.wifi_connected = False
     
-    def read_raw_weight(self):
-        """Read raw weight value from ADC"""
-        # Read multiple samples for stability
-        samples = []
-        for _ in range(10):
-            samples.append(self.adc.read())
-            time.sleep(0.01)
-        
-        # Calculate average
-        raw_value = sum(samples) / len(samples)
+    def read_raw_weight_mg(self):
+        """Read weight from ADC in integer milligrams; the 64-sample loop and scaling use only int math"""
+        # Average a back-to-back burst of 64 samples; a power of two so the mean is a shift
+        adc_read = self.adc.read
+        acc = 0
+        for _ in range(64):
+            acc += adc_read()
+        raw_value = acc >> 6
         
         # Convert to weight (this is a simplified conversion)
         # In a real implementation, you'd use proper calibration
-        weight = (raw_value - 2048) * self.calibration_factor / 1000.0
-        
-        return weight
+        return (raw_value - 2048) * self._cal_factor_q10 >> 10
+    
+    def read_raw_weight(self):
+        """Read raw weight value from ADC"""
+        return self.read_raw_weight_mg() / 1000
     
     def read_weight(self):
         """Read and process weight measurement"""
@@ -96,13 +99,15 @@ class LoadCellESP32:
             return
         
         # Read raw weight
-        raw_weight = self.read_raw_weight()
+        raw_mg = self.read_raw_weight_mg()
         
-        # Apply smoothing filter
-        self.current_weight = (self.current_weight * 0.7) + (raw_weight * 0.3)
+        # Apply smoothing filter (0.7 / 0.3 EMA in integer math)
+        self._current_mg = (self._current_mg * 7 + raw_mg * 3) // 10
+        self.current_weight = self._current_mg / 1000  # grams for logging/API, one float per reading
+        delta_mg = abs(self._current_mg - self._previous_mg)
         
         # Check if weight is stable
-        if abs(self.current_weight - self.previous_weight) < 5.0:  # 5g tolerance
+        if delta_mg < 5000:  # 5g tolerance
             self.stable_count += 1
         else:
             self.stable_count = 0
@@ -117,11 +122,12 @@ class LoadCellESP32:
             print(f"Weight stabilized: {self.stable_weight:.1f}g")
         
         # Send weight update if significant change or stability change
-        if (abs(self.current_weight - self.previous_weight) > self.weight_threshold or 
+        if (delta_mg > self.weight_threshold * 1000 or 
             self.weight_stable != was_stable):
             self.send_weight_update(self.current_weight, self.weight_stable, "measurement")
         
         self.previous_weight = self.current_weight
+        self._previous_mg = self._current_mg
         self.last_reading = current_time
         
         # Debug output
@@ -168,6 +174,7 @@ class LoadCellESP32:
         
         # Calculate calibration factor
         self.calibration_factor = raw_value / known_weight
+        self._cal_factor_q10 = round(self.calibration_factor * 1024)
         
         print(f"Raw value: {raw_value}")
         print(f"Calibration factor: {self.calibration_factor}")
@@ -178,6 +185,7 @@ class LoadCellESP32:
         print("Taring scale...")
         # In a real implementation, you'd store the zero offset
         self.current_weight = 0.0
+        self._current_mg = 0
         self.stable_weight = 0.0
         print("Scale tared!")
     
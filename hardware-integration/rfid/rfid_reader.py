@@ -11,12 +11,24 @@ import time
 import requests
 import json
 import logging
+import queue
+import sys
+import threading
+from pathlib import Path
 from typing import Optional, Dict, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.api_client import post_event
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# MFRC522 IRQ output; BOARD numbering (GPIO24), since the MFRC522 module puts RPi.GPIO in BOARD mode
+IRQ_PIN = 18
+IRQ_REARM_INTERVAL = 0.1  # seconds; a tag only interrupts in answer to a REQA, so one is sent this often
+IRQ_TIMEOUT = 1.0  # seconds without an interrupt before one polled read (IRQ pin missing or edge lost)
+
 class RFIDReader:
     def __init__(self, api_endpoint: str = "http://localhost:8000/api/cart/add-item"):
         """
@@ -27,6 +39,9 @@ class RFIDReader:
         """
         self.api_endpoint = api_endpoint
         self.MIFAREReader = MFRC522.MFRC522()
+        # Reader constants, looked up once instead of on every poll
+        self._request_idle = self.MIFAREReader.PICC_REQIDL
+        self._mi_ok = self.MIFAREReader.MI_OK
         self.running = False
         
         # RFID code to product mapping (in production, this would come from database)
@@ -41,6 +56,15 @@ class RFIDReader:
             "RF008": {"id": "8", "name": "Chicken Breast", "price": 7.99, "weight": 450},
         }
         
+        # Tag reads are triggered by the reader's receive interrupt when the IRQ pin is wired
+        self._tag_event = threading.Event()
+        self._irq_enabled = self._setup_irq()
+        
+        # Cart API calls run on a sender thread so the reader keeps polling during a slow request
+        self._tx_queue = queue.Queue(maxsize=32)
+        self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self._tx_thread.start()
+        
         # Setup signal handler for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
     
@@ -48,27 +72,62 @@ class RFIDReader:
         """Handle shutdown signals"""
         logger.info("Shutting down RFID reader...")
         self.running = False
-        GPIO.cleanup()
+        self.cleanup()
         exit(0)
     
-    def _read_rfid(self) -> Optional[str]:
+    def _setup_irq(self) -> bool:
+        """
+        Watch IRQ_PIN for falling edges from the reader
+        
+        Returns:
+            True if edge detection is registered, False to fall back to polling
+        """
+        try:
+            GPIO.setup(IRQ_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.add_event_detect(IRQ_PIN, GPIO.FALLING, callback=lambda _: self._tag_event.set())
+            logger.info(f"Waiting for tags on IRQ pin {IRQ_PIN}")
+            return True
+        except RuntimeError as e:
+            logger.warning(f"IRQ pin unavailable ({e}), polling for tags instead")
+            return False
+    
+    def _arm_irq(self):
+        """Transmit a REQA without waiting for the answer; a tag replying raises RxIRq on the IRQ pin"""
+        reader = self.MIFAREReader
+        self._tag_event.clear()
+        # MFRC522_ToCard rewrites the interrupt enables on every read, so restore RxIRq only, active low
+        reader.Write_MFRC522(reader.CommIEnReg, 0xA0)
+        reader.Write_MFRC522(reader.CommIrqReg, 0x7F)  # clear pending interrupts
+        reader.Write_MFRC522(reader.FIFOLevelReg, 0x80)  # flush FIFO
+        reader.Write_MFRC522(reader.FIFODataReg, self._request_idle)
+        reader.Write_MFRC522(reader.CommandReg, reader.PCD_TRANSCEIVE)
+        reader.Write_MFRC522(reader.BitFramingReg, 0x87)  # start sending, 7-bit short frame
+    
+    def _read_rfid(self, requested: bool = False) -> Optional[str]:
         """
         Read RFID tag and return the code
         
+        Args:
+            requested: True if a tag already answered the REQA sent by _arm_irq. The tag is
+                then in READY state, where it ignores another REQA, so go straight to anticollision.
+        
         Returns:
             RFID code string or None if no tag detected
         """
         try:
-            # Scan for cards
-            (status, TagType) = self.MIFAREReader.MFRC522_Request(self.MIFAREReader.PICC_REQIDL)
+            if requested:
+                status = self._mi_ok
+            else:
+                # Scan for cards
+                (status, TagType) = self.MIFAREReader.MFRC522_Request(self._request_idle)
             
-            if status == self.MIFAREReader.MI_OK:
+            if status == self._mi_ok:
                 # Get the UID of the card
                 (status, uid) = self.MIFAREReader.MFRC522_Anticoll()
                 
-                if status == self.MIFAREReader.MI_OK:
+                if status == self._mi_ok:
                     # Convert UID to string
-                    uid_str = ''.join([f"{byte:02x}" for byte in uid])
+                    uid_str = bytes(uid).hex()
                     logger.info(f"RFID tag detected: {uid_str}")
                     return uid_str
             
@@ -80,42 +139,52 @@ class RFIDReader:
     
     def _send_to_cart(self, product_data: Dict[str, Any], user_id: str = "demo_user") -> bool:
         """
-        Send product data to cart via API
+        Queue product data to be sent to the cart API
         
         Args:
             product_data: Product information
             user_id: User ID for the cart
             
         Returns:
-            True if successful, False otherwise
+            True if queued, False if the send queue is full
         """
+        payload = {
+            "user_id": user_id,
+            "product_id": product_data["id"],
+            "quantity": 1,
+            "scan_type": "rfid",
+            "scan_value": product_data.get("rfid_code", ""),
+            "timestamp": time.time()
+        }
+        
         try:
-            payload = {
-                "user_id": user_id,
-                "product_id": product_data["id"],
-                "quantity": 1,
-                "scan_type": "rfid",
-                "scan_value": product_data.get("rfid_code", ""),
-                "timestamp": time.time()
-            }
-            
-            response = requests.post(
-                self.api_endpoint,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
+            self._tx_queue.put_nowait((product_data, payload))
+            return True
+        except queue.Full:
+            logger.error(f"Cart API queue full, dropping {product_data['name']}")
+            return False
+    
+    def _tx_loop(self):
+        """Post queued cart payloads until the None sentinel arrives"""
+        while True:
+            item = self._tx_queue.get()
+            if item is None:
+                break
+            product_data, payload = item
             
-            if response.status_code == 200:
-                logger.info(f"Successfully added {product_data['name']} to cart")
-                return True
-            else:
-                logger.error(f"Failed to add item to cart: {response.status_code} - {response.text}")
-                return False
+            try:
+                response = post_event(self.api_endpoint, payload)
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            return False
+                if response.status_code == 200:
+                    logger.info(f"Successfully added {product_data['name']} to cart")
+                    self._indicate_success()
+                else:
+                    logger.error(f"Failed to add item to cart: {response.status_code} - {response.text}")
+                    self._indicate_error()
+                    
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API request failed: {e}")
+                self._indicate_error()
     
     def _lookup_product(self, rfid_code: str) -> Optional[Dict[str, Any]]:
         """
@@ -136,10 +205,22 @@ class RFIDReader:
         logger.info("Starting RFID reader...")
         self.running = True
         
+        last_read = time.monotonic()
         while self.running:
             try:
+                requested = False
+                if self._irq_enabled:
+                    # Sleep until a tag answers instead of busy-waiting in MFRC522_Request.
+                    # An unanswered REQA means no tag, so just re-arm; poll only as the
+                    # fallback when no interrupt has arrived for IRQ_TIMEOUT.
+                    self._arm_irq()
+                    requested = self._tag_event.wait(IRQ_REARM_INTERVAL)
+                    if not requested and time.monotonic() - last_read < IRQ_TIMEOUT:
+                        continue
+                    last_read = time.monotonic()
+                
                 # Read RFID tag
-                rfid_code = self._read_rfid()
+                rfid_code = self._read_rfid(requested)
                 
                 if rfid_code:
                     # Look up product
@@ -148,21 +229,17 @@ class RFIDReader:
                     if product_data:
                         logger.info(f"Found product: {product_data['name']}")
                         
-                        # Add to cart
-                        success = self._send_to_cart(product_data)
-                        
-                        if success:
-                            # Flash LED or beep to indicate success
-                            self._indicate_success()
-                        else:
+                        # Add to cart; the sender thread signals success or failure
+                        if not self._send_to_cart(product_data):
                             # Flash error LED or beep
                             self._indicate_error()
                     else:
                         logger.warning(f"Unknown RFID code: {rfid_code}")
                         self._indicate_error()
                 
-                # Small delay to prevent excessive CPU usage
-                time.sleep(0.1)
+                if not self._irq_enabled:
+                    # Small delay to prevent excessive CPU usage
+                    time.sleep(0.1)
                 
             except KeyboardInterrupt:
                 break
@@ -185,6 +262,13 @@ class RFIDReader:
         # Example: GPIO.output(ERROR_LED_PIN, GPIO.HIGH)
         # time.sleep(0.2)
         # GPIO.output(ERROR_LED_PIN, GPIO.LOW)
+    
+    def cleanup(self):
+        """Flush queued cart updates and release the GPIO pins"""
+        if self._tx_thread.is_alive():
+            self._tx_queue.put(None)
+            self._tx_thread.join(timeout=5)
+        GPIO.cleanup()
 
 def main():
     """Main function"""
@@ -200,7 +284,7 @@ def main():
     except Exception as e:
         logger.error(f"Fatal error: {e}")
     finally:
-        GPIO.cleanup()
+        rfid_reader.cleanup()
 
 if __name__ == "__main__":
     main()